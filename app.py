@@ -7,25 +7,62 @@ and stores results into Neon `public.events` with idempotency.
 Core guarantees:
 - Swagger with "Authorize" button (API key header: X-Run-Token).
 - Idempotent inserts via UNIQUE index on (source_message_id) + ON CONFLICT DO NOTHING.
-- DB connection opened per request and closed in finally (serverless-safe).
-- Optional Gemini parsing with robust JSON fence handling.
-- Startup sanity: create UNIQUE index IF NOT EXISTS (safe/idempotent).
+- DB connections checked out from a process-wide psycopg_pool (no per-request TLS handshake).
+- Optional Gemini parsing with robust JSON fence handling; the static instruction is
+  sent once via Gemini context caching (fallback: system_instruction).
+- Gemini output constrained by a response_schema; results cached by (subject, snippet)
+  hash in-process (LRU) and in `public.ai_parse_cache` for PARSE_CACHE_TTL_DAYS.
+- Startup sanity (background, non-blocking): create tables + indexes IF NOT EXISTS, each step
+  independently (optional pg_trgm indexes last).
+
+Connection pooling
+- Point DATABASE_URL at PgBouncer in transaction mode (Neon: the `-pooler` host; other
+  PgBouncers: set DB_PGBOUNCER=1). Many app connections then share a few server
+  backends, so worker count no longer runs into Postgres' max_connections.
+- Trade-off: a server backend only belongs to us for one transaction, so prepared
+  statements are disabled (prepare_threshold=None) and session state (SET, advisory
+  locks, temp tables outside a transaction) must not be relied on.
+- Size per worker: DB_POOL_MAX × workers should stay below the pooler's client limit
+  (direct host: below Postgres' max_connections minus headroom).
 
 Endpoints
 - GET  /health
+- GET  /health/db (DB ping + events count estimate; ?exact=true for COUNT(*); cached 5s)
 - POST /run       (imports from Gmail → DB; token required)
-- GET  /events    (list with filters/pagination; token required)
+- GET  /events    (list with filters/keyset pagination; token required)
 - GET  /events/{id}
 - GET  /events/by-source/{source_message_id}
 
 Environment
 - ADMIN_BEARER            (token for /run & /events; default: "alpha-12345")
-- DATABASE_URL            (Neon URL; recommend adding ?sslmode=require)
+- DATABASE_URL            (Neon URL; recommend adding ?sslmode=require; prefer the `-pooler` host)
+- DB_POOL_MIN, DB_POOL_MAX (connections per worker; defaults: 1, 10)
+- DB_POOL_WARM            ("1" = connect DB_POOL_MIN conns before serving; default: "0")
+- DB_POOL_WARM_TIMEOUT    (seconds to wait for that warm-up; default: 30)
+- DB_PREPARE_THRESHOLD    (executions before psycopg prepares a statement; default: 5)
+- DB_PGBOUNCER            ("1" = DATABASE_URL is a transaction-mode PgBouncer; auto for `-pooler`)
+- DB_HTTP                 ("1" = serverless: /run inserts via Neon SQL-over-HTTP; default: "0")
+- RUN_DDL_ON_STARTUP      ("0" = skip index/table creation in startup warm-up; default: "1")
 - GMAIL_CLIENT_ID, GMAIL_CLIENT_SECRET, GMAIL_REFRESH_TOKEN
 - GMAIL_QUERY             (default: "in:inbox is:unread newer_than:7d")
 - GMAIL_MAX_RESULTS       (default: 10)
+- GMAIL_HISTORY_SYNC      ("1" = incremental sync via Gmail History API; default: "0")
+- GMAIL_HISTORY_LABEL     (label watched in history mode; default: "INBOX")
+- INSERT_BATCH_SIZE       (rows per multi-row INSERT; default: 100)
+- INSERT_PARALLEL         (max concurrent insert connections for large /run batches; default: 1)
+- COPY_THRESHOLD          (rows at which inserts switch to COPY + staging table; default: 200)
 - GEMINI_API_KEY          (optional; disables AI if unset)
 - GEMINI_MODEL            (default: "gemini-2.5-flash")
+- GEMINI_CONCURRENCY      (max in-flight Gemini calls per process; default: 8)
+- GEMINI_BATCH_SIZE       (emails parsed per Gemini call; default: 8)
+- GEMINI_RPM              (max Gemini calls per minute per process; default: 0 = unlimited)
+- GEMINI_MAX_RETRIES      (retries on Gemini 429/503, honoring the server's delay; default: 2)
+- GEMINI_MAX_OUTPUT_TOKENS (output-token cap per email, scaled by batch size; default: 0 = none.
+                           Thinking models such as gemini-2.5-* count thinking tokens against it)
+- EVENTS_CACHE_TTL        (seconds an /events page is cached per worker; default: 0 = off.
+                           With several workers, reads can lag a /run by up to this long)
+- PARSE_CACHE_TTL_DAYS    (age after which a cached Gemini parse is redone; default: 7)
+- THREADPOOL_SIZE         (worker threads for blocking handlers/offloads; default: 100)
 - LOG_LEVEL               (default: "INFO")
 """
 
@@ -33,14 +70,31 @@ from __future__ import annotations
 
 import os
 import re
+import asyncio
+import base64
+import hashlib
+import hmac
 import json
 import logging
-from datetime import datetime
-from typing import List, Optional, Tuple, Dict, Any
-
-from fastapi import FastAPI, Depends, HTTPException, Request, Security, Query
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterator, List, Optional, Sequence, Tuple, Dict, Any
+from urllib.parse import urlparse
+
+import anyio.to_thread
+import requests
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, Security, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field
+from typing_extensions import TypedDict  # pydantic rejects typing.TypedDict on Python < 3.12
 
 # ----------------- Logging -----------------
 logging.basicConfig(
@@ -54,11 +108,20 @@ log = logging.getLogger("ai-events-agent")
 try:
     import psycopg  # type: ignore
     from psycopg.types.json import Json  # <-- JSONB adapter (critical fix)
+    from psycopg.rows import class_row, dict_row  # type: ignore
 except Exception as e:
     psycopg = None  # type: ignore
     Json = None  # type: ignore
+    class_row = dict_row = None  # type: ignore
     log.warning("psycopg import unavailable: %s", e)
 
+# Connection pool (install as `psycopg[pool]`)
+try:
+    from psycopg_pool import ConnectionPool  # type: ignore
+except Exception as e:
+    ConnectionPool = None  # type: ignore
+    log.warning("psycopg_pool import unavailable: %s", e)
+
 # Gmail API libs (optional)
 try:
     from googleapiclient.discovery import build  # type: ignore
@@ -67,6 +130,12 @@ except Exception:
     build = None  # type: ignore
     Credentials = None  # type: ignore
 
+# Fast JSON (optional; falls back to stdlib json)
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
 # Gemini AI libs (optional)
 try:
     import google.generativeai as genai  # type: ignore
@@ -74,10 +143,24 @@ except Exception:
     genai = None  # type: ignore
 
 # ----------------- FastAPI -----------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup before the first request, shutdown after the last (see the Startup section)."""
+    tune_threadpools()
+    await on_startup()
+    try:
+        yield
+    finally:
+        on_shutdown()
+
+
 app = FastAPI(
     title="AI Events Agent",
     version="2.4.0",
+    lifespan=lifespan,
     swagger_ui_parameters={"persistAuthorization": True},  # remember token in UI
+    # orjson serializes responses in C (datetimes/dicts natively); stdlib json otherwise
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
 )
 
 # Swagger “Authorize” button config — API key via header X-Run-Token
@@ -90,15 +173,45 @@ api_key_header = APIKeyHeader(
 # ----------------- Environment Vars -----------------
 RUN_TOKEN = os.getenv("ADMIN_BEARER", "alpha-12345")
 DATABASE_URL = os.getenv("DATABASE_URL")  # e.g., postgres://.../db?sslmode=require
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_WARM = os.getenv("DB_POOL_WARM", "0") == "1"
+DB_POOL_WARM_TIMEOUT = float(os.getenv("DB_POOL_WARM_TIMEOUT", "30"))
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))  # psycopg's default
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1" or "-pooler" in (DATABASE_URL or "")
+DB_HTTP = os.getenv("DB_HTTP", "0") == "1"
+# Startup DDL (IF NOT EXISTS indexes/tables) still takes brief locks; set "0" on
+# cold-booting serverless instances once a deploy has created the schema.
+RUN_DDL_ON_STARTUP = os.getenv("RUN_DDL_ON_STARTUP", "1") == "1"
 
 GMAIL_CLIENT_ID = os.getenv("GMAIL_CLIENT_ID")
 GMAIL_CLIENT_SECRET = os.getenv("GMAIL_CLIENT_SECRET")
 GMAIL_REFRESH_TOKEN = os.getenv("GMAIL_REFRESH_TOKEN")
 GMAIL_QUERY = os.getenv("GMAIL_QUERY", "in:inbox is:unread newer_than:7d")
 GMAIL_MAX_RESULTS = int(os.getenv("GMAIL_MAX_RESULTS", "10"))
+GMAIL_HISTORY_SYNC = os.getenv("GMAIL_HISTORY_SYNC", "0") == "1"
+GMAIL_HISTORY_LABEL = os.getenv("GMAIL_HISTORY_LABEL", "INBOX")
+
+# Rows per multi-row INSERT (6 params/row; keep under Postgres' 65535 bind limit).
+INSERT_BATCH_SIZE = max(1, min(int(os.getenv("INSERT_BATCH_SIZE", "100")), 10000))
+# Slices of a large /run inserted concurrently, each on its own pooled connection.
+INSERT_PARALLEL = max(1, min(int(os.getenv("INSERT_PARALLEL", "1")), DB_POOL_MAX))
+# At or above this many rows, inserts go through COPY + staging table instead.
+COPY_THRESHOLD = max(1, int(os.getenv("COPY_THRESHOLD", "200")))
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "0"))  # 0 = no per-minute cap
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))  # on 429/503
+GEMINI_BATCH_SIZE = max(1, int(os.getenv("GEMINI_BATCH_SIZE", "8")))  # emails per call
+# Output cap per email in a batch; the call gets this x GEMINI_BATCH_SIZE. 0 = no cap (the
+# default: on thinking models the cap also covers thinking, which the SDK cannot budget).
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "0"))
+
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+EVENTS_CACHE_TTL = float(os.getenv("EVENTS_CACHE_TTL", "0"))  # seconds; 0 disables (opt-in)
+PARSE_CACHE_TTL_DAYS = max(1, int(os.getenv("PARSE_CACHE_TTL_DAYS", "7")))
 
 # ----------------- Models -----------------
 class EventOut(BaseModel):
@@ -112,6 +225,15 @@ class EventOut(BaseModel):
     source_snippet: Optional[str] = None  # raw Gmail snippet
 
 
+@dataclass(slots=True)
+class _Event:
+    """Internal EventOut twin for the /run hot path (no validation); converted at the response."""
+    subject: str
+    notes: Optional[str] = None
+    source_gmail_id: Optional[str] = None
+    source_snippet: Optional[str] = None
+
+
 class RunResponse(BaseModel):
     """Response for /run: predictable, demo-friendly."""
     total_emails: int
@@ -133,37 +255,257 @@ class EventRecord(BaseModel):
     created_at: Optional[datetime] = None
 
 # ----------------- Security -----------------
+_RUN_TOKEN_B = RUN_TOKEN.encode("utf-8")
+
+
 def require_token(x_token: str = Security(api_key_header), req: Request = None):
     """
     Accept token from Swagger's Authorize popup (X-Run-Token) OR fallback to ?token=.
     """
     token = x_token or (req.query_params.get("token") if req else None)
-    if token != RUN_TOKEN:
+    if not token or not hmac.compare_digest(token.encode("utf-8"), _RUN_TOKEN_B):
         raise HTTPException(status_code=401, detail="Invalid or missing token")
 
+# ----------------- SQL -----------------
+# Module-level SQL: each query shape always has byte-identical text, so psycopg's automatic
+# prepare (prepare_threshold, default 5) reliably reuses the server-side plan.
+_EVENT_COLUMNS = (
+    "id, source_message_id, subject, sender, event_datetime, location, raw_payload, created_at"
+)
+# /events?compact=true: table-view columns, skipping the raw_payload JSONB (notes + snippet).
+_EVENT_LIST_COLUMNS = "id, source_message_id, subject, sender, event_datetime, location, created_at"
+
+SQL_GET_BY_ID = f"""
+SELECT {_EVENT_COLUMNS}
+FROM public.events
+WHERE id = %s;
+"""
+
+SQL_GET_BY_SOURCE = f"""
+SELECT {_EVENT_COLUMNS}
+FROM public.events
+WHERE source_message_id = %s;
+"""
+
+SQL_INSERT_EVENT = """
+INSERT INTO public.events
+  (source_message_id, subject, sender, event_datetime, location, raw_payload)
+VALUES
+  {values}
+ON CONFLICT (source_message_id) DO NOTHING
+RETURNING id;
+"""
+_INSERT_ROW_SQL = "(%s, %s, %s, %s, %s, %s)"
+
+# Large imports: COPY into a per-transaction staging table, then one INSERT ... SELECT.
+SQL_STAGE_CREATE = """
+CREATE TEMP TABLE _events_stage ON COMMIT DROP AS
+SELECT source_message_id, subject, sender, event_datetime, location, raw_payload
+FROM public.events WITH NO DATA;
+"""
+SQL_STAGE_COPY = """
+COPY _events_stage (source_message_id, subject, sender, event_datetime, location, raw_payload)
+FROM STDIN
+"""
+SQL_STAGE_MERGE = """
+INSERT INTO public.events
+  (source_message_id, subject, sender, event_datetime, location, raw_payload)
+SELECT source_message_id, subject, sender, event_datetime, location, raw_payload
+FROM _events_stage
+ON CONFLICT (source_message_id) DO NOTHING
+RETURNING id;
+"""
+
+SQL_LIST_BASE = """
+SELECT {columns}
+FROM public.events
+{where}
+ORDER BY COALESCE(event_datetime, created_at) DESC NULLS LAST, id DESC
+LIMIT %s OFFSET %s;
+"""
+
+# /events filter name → WHERE fragment (applied in this order).
+_LIST_FILTERS: Dict[str, str] = {
+    "q": "(subject ILIKE %s OR location ILIKE %s)",
+    "date_from": "(event_datetime IS NOT NULL AND event_datetime >= %s)",
+    "date_to": "(event_datetime IS NOT NULL AND event_datetime <= %s)",
+    # JSONB boolean compared as text ('true'/'false') so ix_events_recurring applies;
+    # records without the key won't match either value.
+    "recurring": "((raw_payload->>'recurring') = %s)",
+    # created_at defaults to NOW(), so the ordering key is never NULL in practice.
+    "cursor": "((COALESCE(event_datetime, created_at), id) < (%s, %s))",
+}
+
+# /health/db: planner estimate (catalog lookup, no scan) vs exact count.
+SQL_EVENTS_ESTIMATE = """
+SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'public.events'::regclass;
+"""
+SQL_EVENTS_COUNT = "SELECT COUNT(*) FROM public.events;"
+
+SQL_KNOWN_SOURCE_IDS = """
+SELECT source_message_id
+FROM public.events
+WHERE source_message_id = ANY(%s);
+"""
+
+SQL_SYNC_STATE_GET = "SELECT value FROM public.sync_state WHERE key = %s;"
+
+SQL_SYNC_STATE_SET = """
+INSERT INTO public.sync_state (key, value)
+VALUES (%s, %s)
+ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW();
+"""
+
+# One lookup / one upsert per Gemini batch; array parameters keep a single fixed shape.
+SQL_PARSE_CACHE_GET = """
+SELECT key, subject, notes FROM public.ai_parse_cache
+WHERE key = ANY(%s) AND created_at > NOW() - make_interval(days => %s);
+"""
+
+# First writer wins while the entry is fresh; an expired one is overwritten.
+SQL_PARSE_CACHE_PUT = """
+INSERT INTO public.ai_parse_cache (key, subject, notes)
+SELECT * FROM unnest(%s::text[], %s::text[], %s::text[])
+ON CONFLICT (key) DO UPDATE
+SET subject = EXCLUDED.subject, notes = EXCLUDED.notes, created_at = NOW()
+WHERE ai_parse_cache.created_at <= NOW() - make_interval(days => %s);
+"""
+
+SQL_PARSE_CACHE_PURGE = """
+DELETE FROM public.ai_parse_cache WHERE created_at <= NOW() - make_interval(days => %s);
+"""
+
+
+@lru_cache(maxsize=None)
+def _insert_sql(n_rows: int) -> str:
+    """Multi-row INSERT text for n_rows (memoized; n is bounded by INSERT_BATCH_SIZE)."""
+    return SQL_INSERT_EVENT.format(values=", ".join([_INSERT_ROW_SQL] * n_rows))
+
+
+@lru_cache(maxsize=128)
+def _list_sql(active: Tuple[str, ...], compact: bool = False) -> str:
+    """/events SQL for a tuple of active filter names (at most 2**5 × 2 shapes)."""
+    where = f"WHERE {' AND '.join(_LIST_FILTERS[f] for f in active)}" if active else ""
+    columns = _EVENT_LIST_COLUMNS if compact else _EVENT_COLUMNS
+    return SQL_LIST_BASE.format(columns=columns, where=where)
+
 # ----------------- DB Helpers -----------------
-def get_db() -> Optional["psycopg.Connection"]:
+def _build_pool() -> Optional["ConnectionPool"]:
     """
-    Open Neon DB connection lazily with autocommit.
-    Closed after each request to prevent connection leaks on serverless hosts.
+    Build the process-wide pool (not opened yet; see on_startup).
+    - check_connection drops conns killed while Neon's compute was idle.
+    - Fixed-shape hot statements (by id/source, known ids, parse cache) pass prepare=True
+      (parsed/planned once per connection). Variable shapes (multi-row INSERTs, /events
+      filters) are left to DB_PREPARE_THRESHOLD, so a one-off shape costs no extra Parse
+      round trip or slot in psycopg's prepared_max LRU. On a PgBouncer endpoint
+      (DB_PGBOUNCER, transaction mode) prepare_threshold=None disables both.
     """
-    if psycopg is None:
-        log.error("psycopg not available; DB ops disabled.")
+    if psycopg is None or ConnectionPool is None or not DATABASE_URL:
         return None
-    if not DATABASE_URL:
+    kwargs: Dict[str, Any] = {
+        "autocommit": True,
+        "prepare_threshold": None if DB_PGBOUNCER else DB_PREPARE_THRESHOLD,
+    }
+    return ConnectionPool(
+        DATABASE_URL,
+        min_size=DB_POOL_MIN,
+        max_size=max(DB_POOL_MIN, DB_POOL_MAX),
+        kwargs=kwargs,
+        num_workers=2,
+        open=False,
+        check=ConnectionPool.check_connection,
+    )
+
+
+POOL = _build_pool()
+
+
+@contextmanager
+def get_db(timeout: Optional[float] = None) -> Iterator[Optional["psycopg.Connection"]]:
+    """
+    Check out a pooled Neon connection (autocommit) for the duration of the block.
+    Yields None when the DB is not configured/reachable, so callers can degrade gracefully.
+    `timeout` bounds the checkout wait (default: the pool's, 30s).
+    """
+    if psycopg is None or ConnectionPool is None:
+        log.error("psycopg/psycopg_pool not available; DB ops disabled.")
+        yield None
+        return
+    if POOL is None:
         log.warning("DATABASE_URL missing; skipping DB connection.")
-        return None
+        yield None
+        return
     try:
-        conn = psycopg.connect(DATABASE_URL, autocommit=True)
-        return conn
+        conn = POOL.getconn(timeout=timeout)
     except Exception as e:
         log.error("DB connection failed: %s", e)
-        return None
+        yield None
+        return
+    try:
+        yield conn
+    finally:
+        POOL.putconn(conn)
+
+
+def get_conn() -> Iterator[Optional["psycopg.Connection"]]:
+    """FastAPI dependency: a pooled connection (or None) returned to the pool after the route."""
+    with get_db() as conn:
+        yield conn
+
+
+_PLACEHOLDER_RE = re.compile(r"%s")
+
+
+class NeonHTTPClient:
+    """
+    One-shot statements over Neon's SQL-over-HTTP endpoint (https://<host>/sql).
+    No TCP/TLS/auth handshake per cold process — suited to short-lived serverless workers.
+    Same execute(sql, params) -> rows shape as a psycopg cursor; `%s` placeholders are
+    rewritten to `$n`, and the requests.Session keeps the HTTPS connection alive.
+    """
+
+    def __init__(self, url: str):
+        self._endpoint = f"https://{urlparse(url).hostname}/sql"
+        self._session = requests.Session()
+        self._session.headers.update(
+            {
+                "Neon-Connection-String": url,
+                "Neon-Array-Mode": "true",
+            }
+        )
+
+    @staticmethod
+    def _param(v: Any) -> Any:
+        if Json is not None and isinstance(v, Json):
+            return json.dumps(v.obj)
+        if isinstance(v, datetime):
+            return v.isoformat()
+        return v
+
+    def execute(
+        self, sql: str, params: Sequence[Any] = (), timeout: float = 30.0
+    ) -> List[Tuple[Any, ...]]:
+        n = iter(range(1, len(params) + 1))
+        query = _PLACEHOLDER_RE.sub(lambda _: f"${next(n)}", sql)
+        resp = self._session.post(
+            self._endpoint,
+            json={"query": query, "params": [self._param(v) for v in params]},
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        return [tuple(r) for r in resp.json().get("rows", [])]
+
+
+# Serverless mode: /run inserts + startup ping go over HTTP; reads keep using the pool.
+NEON_HTTP = NeonHTTPClient(DATABASE_URL) if (DB_HTTP and DATABASE_URL) else None
 
 
 def ensure_indexes(conn: "psycopg.Connection") -> None:
     """
-    Create a unique index for idempotent imports (safe to run every startup).
+    Create indexes (safe to run every startup):
+    - unique index for idempotent imports
+    - ordering index backing keyset pagination on `/events`
+    - expression index for the `recurring` JSONB filter
     """
     if conn is None:
         return
@@ -174,61 +516,203 @@ def ensure_indexes(conn: "psycopg.Connection") -> None:
             ON public.events (source_message_id);
             """
         )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_order
+            ON public.events ((COALESCE(event_datetime, created_at)) DESC NULLS LAST, id DESC);
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_recurring
+            ON public.events ((raw_payload->>'recurring'));
+            """
+        )
+
+
+def ensure_trigram_indexes(conn: "psycopg.Connection") -> None:
+    """
+    pg_trgm GIN indexes so `/events?q=` (ILIKE '%q%') is an index probe, not a seq scan.
+    Optional: needs a role allowed to CREATE EXTENSION; /events?q= works without them.
+    """
+    if conn is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_subject_trgm
+            ON public.events USING GIN (subject gin_trgm_ops);
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_location_trgm
+            ON public.events USING GIN (location gin_trgm_ops);
+            """
+        )
 
 
-def insert_into_public_events(conn: "psycopg.Connection", rows: List[EventOut]) -> int:
+def ensure_parse_cache(conn: "psycopg.Connection") -> None:
+    """
+    Create the Gemini parse cache table (safe to run every startup) and purge entries
+    older than PARSE_CACHE_TTL_DAYS. Keyed by blake2b(subject, snippet) so repeated
+    messages skip the model call.
+    """
+    if conn is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS public.ai_parse_cache (
+              key        TEXT PRIMARY KEY,
+              subject    TEXT,
+              notes      TEXT,
+              created_at TIMESTAMPTZ DEFAULT NOW()
+            );
+            """
+        )
+        cur.execute(SQL_PARSE_CACHE_PURGE, (PARSE_CACHE_TTL_DAYS,))
+
+
+def ensure_sync_state(conn: "psycopg.Connection") -> None:
+    """
+    Create the key/value sync table (safe to run every startup).
+    Holds the Gmail historyId used by incremental /run imports.
+    """
+    if conn is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS public.sync_state (
+              key        TEXT PRIMARY KEY,
+              value      TEXT,
+              updated_at TIMESTAMPTZ DEFAULT NOW()
+            );
+            """
+        )
+
+
+def _sync_state_get(key: str) -> Optional[str]:
+    """Read a sync_state value (None if unset / DB unavailable)."""
+    if POOL is None:
+        return None
+    with get_db() as conn:
+        if not conn:
+            return None
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SQL_SYNC_STATE_GET, (key,))
+                row = cur.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            log.warning("sync_state read failed: %s", e)
+            return None
+
+
+def _sync_state_set(key: str, value: str) -> None:
+    """Upsert a sync_state value."""
+    if POOL is None:
+        return
+    with get_db() as conn:
+        if not conn:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SQL_SYNC_STATE_SET, (key, value))
+        except Exception as e:
+            log.warning("sync_state write failed: %s", e)
+
+
+def _event_params(rows: List[_Event]) -> List[Tuple[Any, ...]]:
+    """One INSERT parameter tuple per row that has a Gmail id (column order of SQL_INSERT_EVENT)."""
+    params: List[Tuple[Any, ...]] = []
+    for r in rows:
+        if not r.source_gmail_id:
+            continue
+
+        raw_payload = {
+            "subject": r.subject,
+            "notes": r.notes,
+            "source_snippet": r.source_snippet,
+            "source_gmail_id": r.source_gmail_id,
+        }
+
+        # IMPORTANT: wrap dict with Json(...) so psycopg adapts to JSONB
+        params.append(
+            (
+                r.source_gmail_id,  # source_message_id (UNIQUE)
+                r.subject,          # subject
+                None,               # sender (unknown here)
+                None,               # event_datetime (unknown)
+                None,               # location (unknown)
+                Json(raw_payload),  # raw_payload → JSONB
+            )
+        )
+    return params
+
+
+def insert_into_public_events(conn: "psycopg.Connection", rows: List[_Event]) -> int:
     """
     Insert rows into `public.events` (v2 schema).
     Columns:
-      - source_message_id TEXT UNIQUE  ← EventOut.source_gmail_id
-      - subject           TEXT         ← EventOut.subject
+      - source_message_id TEXT UNIQUE  ← _Event.source_gmail_id
+      - subject           TEXT         ← _Event.subject
       - sender            TEXT         ← (unknown here; None)
       - event_datetime    TIMESTAMPTZ  ← (unknown here; None)
       - location          TEXT         ← (unknown here; None)
       - raw_payload       JSONB        ← dict(subject, notes, snippet, ...)
       - created_at        TIMESTAMPTZ  ← DEFAULT NOW()
     Idempotency: ON CONFLICT (source_message_id) DO NOTHING
+    Batching: one multi-row INSERT per INSERT_BATCH_SIZE rows, pipelined when there are several;
+    from COPY_THRESHOLD rows, COPY into a staging table + one INSERT ... SELECT.
     """
     if not rows or conn is None:
         return 0
 
-    sql = """
-    INSERT INTO public.events
-      (source_message_id, subject, sender, event_datetime, location, raw_payload)
-    VALUES
-      (%s, %s, %s, %s, %s, %s)
-    ON CONFLICT (source_message_id) DO NOTHING
-    RETURNING id;
-    """
+    params = _event_params(rows)
+    if len(params) >= COPY_THRESHOLD:
+        return _copy_insert(conn, params)
+    chunks = [params[i : i + INSERT_BATCH_SIZE] for i in range(0, len(params), INSERT_BATCH_SIZE)]
+    if len(chunks) == 1:
+        with conn.cursor() as cur:
+            cur.execute(_insert_sql(len(chunks[0])), [v for row in chunks[0] for v in row])
+            return len(cur.fetchall())  # ids returned only for actually inserted rows
+
+    # Several chunks: pipeline mode sends every INSERT before reading any result,
+    # so the whole import costs ~1 round-trip instead of one per chunk.
+    with conn.pipeline():
+        cursors = []
+        for chunk in chunks:
+            cur = conn.cursor()
+            cur.execute(_insert_sql(len(chunk)), [v for row in chunk for v in row])
+            cursors.append(cur)
+        inserted = 0
+        for cur in cursors:
+            inserted += len(cur.fetchall())
+            cur.close()
+    return inserted
 
-    inserted = 0
-    with conn.cursor() as cur:
-        for r in rows:
-            if not r.source_gmail_id:
-                continue
 
-            raw_payload = {
-                "subject": r.subject,
-                "notes": r.notes,
-                "source_snippet": r.source_snippet,
-                "source_gmail_id": r.source_gmail_id,
-            }
+def _copy_insert(conn: "psycopg.Connection", params: List[Tuple[Any, ...]]) -> int:
+    """COPY rows into a temp staging table, then merge with ON CONFLICT DO NOTHING."""
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(SQL_STAGE_CREATE)
+        with cur.copy(SQL_STAGE_COPY) as copy:
+            for row in params:
+                copy.write_row(row)
+        cur.execute(SQL_STAGE_MERGE)
+        return len(cur.fetchall())
 
-            # IMPORTANT: wrap dict with Json(...) so psycopg adapts to JSONB
-            cur.execute(
-                sql,
-                (
-                    r.source_gmail_id,  # source_message_id (UNIQUE)
-                    r.subject,          # subject
-                    None,               # sender (unknown here)
-                    None,               # event_datetime (unknown)
-                    None,               # location (unknown)
-                    Json(raw_payload),  # raw_payload → JSONB
-                ),
-            )
-            if cur.fetchone():  # row returned only when actually inserted
-                inserted += 1
 
+def insert_via_http(client: "NeonHTTPClient", rows: List[_Event]) -> int:
+    """insert_into_public_events over Neon's SQL-over-HTTP endpoint (same SQL, same batching)."""
+    params = _event_params(rows)
+    inserted = 0
+    for start in range(0, len(params), INSERT_BATCH_SIZE):
+        chunk = params[start : start + INSERT_BATCH_SIZE]
+        inserted += len(client.execute(_insert_sql(len(chunk)), [v for row in chunk for v in row]))
     return inserted
 
 # ----------------- Gmail Helpers -----------------
@@ -254,357 +738,1392 @@ def build_gmail_service():
     return build("gmail", "v1", credentials=creds, cache_discovery=False)
 
 
+@lru_cache(maxsize=1)
+def get_gmail_service():
+    """
+    Process-wide Gmail client: discovery + Credentials are built once per worker.
+    The cached Credentials refresh their own access token when it expires.
+    """
+    return build_gmail_service()
+
+
+def _is_gmail_auth_error(e: BaseException) -> bool:
+    """Revoked/expired refresh token (RefreshError) or a 401 from the API."""
+    if type(e).__name__ == "RefreshError":
+        return True
+    return getattr(getattr(e, "resp", None), "status", None) == 401
+
+
+def _on_gmail_error(e: BaseException) -> None:
+    """
+    Drop the cached client on auth failures only, so the next /run rebuilds it from the
+    current env credentials; transient errors keep reusing it.
+    """
+    if _is_gmail_auth_error(e):
+        log.warning("Gmail auth error; discarding cached client.")
+        get_gmail_service.cache_clear()
+
+
+# httplib2 (under googleapiclient) is not thread-safe, and the client is now shared
+# across concurrent /run calls — serialize its use (including token refresh).
+_GMAIL_LOCK = threading.Lock()
+
+
+# Sub-requests per Gmail batch call (API max is 100; Google advises <=50 to avoid rate limits).
+GMAIL_BATCH_SIZE = 50
+# messages.list page cap; larger limits follow nextPageToken.
+GMAIL_LIST_PAGE_MAX = 500
+# Runs a message get may fail (non-404) before it is skipped so the history cursor can move on.
+GMAIL_GET_MAX_ATTEMPTS = 3
+_gmail_get_failures: Dict[str, int] = {}  # message id -> failed runs; guarded by _GMAIL_LOCK
+
+
 def fetch_gmail_messages(service, q: str, limit: int = 10) -> List[Tuple[str, str, str]]:
     """
     Fetch messages matching query.
     Returns list of tuples: (message_id, subject, snippet)
+    Lists page by page (nextPageToken) up to `limit`; the per-message gets are sent as
+    Gmail batch requests (ceil(N/500) lists + ceil(N/50) HTTP calls).
     """
     if service is None:
         return []
+    with _GMAIL_LOCK:
+        return _fetch_gmail_messages_locked(service, q, limit)
+
+
+def _fetch_gmail_messages_locked(service, q: str, limit: int) -> List[Tuple[str, str, str]]:
+    """fetch_gmail_messages body; caller holds _GMAIL_LOCK."""
     try:
-        users = service.users()
-        resp = users.messages().list(userId="me", q=q, maxResults=limit).execute()
-        ids = [m["id"] for m in resp.get("messages", [])]
-        results: List[Tuple[str, str, str]] = []
-        for mid in ids:
-            m = users.messages().get(
-                userId="me",
-                id=mid,
-                format="metadata",
-                metadataHeaders=["Subject"],
-            ).execute()
-            headers = m.get("payload", {}).get("headers", [])
-            subject = next(
-                (h["value"] for h in headers if h.get("name", "").lower() == "subject"),
-                "(no subject)",
-            )
-            snippet = m.get("snippet", "")
-            results.append((mid, subject, snippet))
-        return results
+        return _list_and_get(service, q, limit)
     except Exception as e:
         log.error("Gmail fetch failed: %s", e)
+        _on_gmail_error(e)
         return []
 
+
+def _list_and_get(service, q: str, limit: int) -> List[Tuple[str, str, str]]:
+    """messages.list + batched gets (raises on API errors; caller holds _GMAIL_LOCK)."""
+    messages, _ = _get_messages_batched(service, _list_ids(service, q, limit))
+    return messages  # failed gets are listed again next run
+
+
+def _list_ids(service, q: str, limit: int) -> List[str]:
+    """Up to `limit` ids matching `q`, following nextPageToken; caller holds _GMAIL_LOCK."""
+    ids: List[str] = []
+    page_token = None
+    while len(ids) < limit:
+        resp = (
+            service.users()
+            .messages()
+            .list(
+                userId="me",
+                q=q,
+                maxResults=min(limit - len(ids), GMAIL_LIST_PAGE_MAX),
+                pageToken=page_token,
+                fields="messages/id,nextPageToken",
+            )
+            .execute()
+        )
+        ids.extend(m["id"] for m in resp.get("messages", []))
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            break
+    return ids[:limit]
+
+
+def _get_messages_batched(
+    service, ids: List[str]
+) -> Tuple[List[Tuple[str, str, str]], List[str]]:
+    """
+    (id, subject, snippet) for each id via Gmail batch requests, plus the ids whose get
+    failed (deleted messages, 404, are just skipped); caller holds _GMAIL_LOCK.
+    """
+    users = service.users()
+    by_id: Dict[str, Tuple[str, str, str]] = {}
+    failed: Dict[str, None] = {}  # ordered set
+
+    def _on_msg(request_id: str, response: Dict[str, Any], exception: Exception) -> None:
+        if exception is not None:
+            log.warning("Gmail get failed for %s: %s", request_id, exception)
+            if getattr(getattr(exception, "resp", None), "status", None) != 404:
+                failed[request_id] = None
+            return
+        failed.pop(request_id, None)
+        headers = {
+            h.get("name", "").lower(): h.get("value", "")
+            for h in response.get("payload", {}).get("headers", [])
+        }
+        subject = headers.get("subject", "(no subject)")
+        by_id[request_id] = (request_id, subject, response.get("snippet", ""))
+
+    def _get(mid: str):
+        return users.messages().get(
+            userId="me",
+            id=mid,
+            format="metadata",
+            metadataHeaders=["Subject"],
+            fields="snippet,payload/headers(name,value)",  # partial response: only what we parse
+        )
+
+    for start in range(0, len(ids), GMAIL_BATCH_SIZE):
+        chunk = ids[start : start + GMAIL_BATCH_SIZE]
+        batch = service.new_batch_http_request(callback=_on_msg)
+        for mid in chunk:
+            batch.add(_get(mid), request_id=mid)
+        try:
+            batch.execute()
+        except Exception as e:
+            # Batch endpoint unavailable (proxy, quota on /batch): degrade to one get per id.
+            log.warning("Gmail batch failed; fetching %d messages individually: %s", len(chunk), e)
+            for mid in chunk:
+                if mid in by_id:
+                    continue
+                try:
+                    _on_msg(mid, _get(mid).execute(), None)
+                except Exception as ex:
+                    _on_msg(mid, {}, ex)
+
+    # Callbacks may fire in any order; keep the input order.
+    return [by_id[mid] for mid in ids if mid in by_id], list(failed)
+
+
+def _history_message_ids(
+    service, start_history_id: str, limit: int
+) -> Tuple[List[str], str, List[Tuple[int, str]]]:
+    """
+    Ids of messages added (under GMAIL_HISTORY_LABEL) since start_history_id, the
+    historyId to resume from next time, and (ids so far, record id) after each history
+    record (see _resume_from). Stops at the first record boundary at or past `limit` ids
+    and resumes from that record, so a long gap drains over several runs.
+    """
+    ids: List[str] = []
+    marks: List[Tuple[int, str]] = []
+    seen = set()
+    history_id, page_token = start_history_id, None
+    while True:
+        resp = service.users().history().list(
+            userId="me",
+            startHistoryId=start_history_id,
+            historyTypes=["messageAdded"],
+            labelId=GMAIL_HISTORY_LABEL,
+            pageToken=page_token,
+            fields="history(id,messagesAdded/message/id),historyId,nextPageToken",
+        ).execute()
+        records = resp.get("history", [])
+        for n, h in enumerate(records, 1):
+            for added in h.get("messagesAdded", []):
+                mid = added["message"]["id"]
+                if mid not in seen:
+                    seen.add(mid)
+                    ids.append(mid)
+            marks.append((len(ids), h["id"]))
+            if len(ids) >= limit and (n < len(records) or resp.get("nextPageToken")):
+                return ids, h["id"], marks
+        history_id = resp.get("historyId", history_id)
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return ids, history_id, marks
+
+
+def _resume_from(
+    history_id: Optional[str],
+    messages: List[Tuple[str, str, str]],
+    ids: List[str],
+    failed: List[str],
+    marks: Sequence[Tuple[int, str]] = (),
+) -> Optional[str]:
+    """
+    historyId to persist (None = keep the old cursor). With failed gets it is the last
+    history record wholly before the first failed id, so the next run retries from there.
+    An id that failed GMAIL_GET_MAX_ATTEMPTS runs is logged and skipped, so one broken
+    message cannot freeze the sync. Caller holds _GMAIL_LOCK.
+    """
+    for mid, _, _ in messages:
+        _gmail_get_failures.pop(mid, None)
+    retry = set()
+    for mid in failed:
+        n = _gmail_get_failures.get(mid, 0) + 1
+        if n >= GMAIL_GET_MAX_ATTEMPTS:
+            _gmail_get_failures.pop(mid, None)
+            log.error("Gmail get for %s failed in %d runs; skipping it.", mid, n)
+        else:
+            _gmail_get_failures[mid] = n
+            retry.add(mid)
+    if not retry:
+        return history_id
+    first = next(i for i, mid in enumerate(ids) if mid in retry)
+    resume = None
+    for count, record_id in marks:
+        if count > first:
+            break
+        resume = record_id
+    log.warning(
+        "Gmail get failed for %d messages; historyId %s.",
+        len(retry),
+        f"advanced to {resume}" if resume else "kept",
+    )
+    return resume
+
+
+def fetch_gmail_changes(
+    service, q: str, limit: int, start_history_id: Optional[str]
+) -> Tuple[List[Tuple[str, str, str]], Optional[str]]:
+    """
+    Incremental fetch via users.history.list: only messages added since the last sync,
+    about `limit` per call. Falls back to the full `q` query when there is no stored
+    historyId yet, or Gmail answers 404 (historyId too old). Returns (messages, historyId
+    to persist or None); failed gets hold the cursor back so the next run retries them.
+    """
+    if service is None:
+        return [], None
+    with _GMAIL_LOCK:
+        try:
+            if start_history_id:
+                try:
+                    ids, history_id, marks = _history_message_ids(
+                        service, start_history_id, limit
+                    )
+                    messages, failed = _get_messages_batched(service, ids)
+                    return messages, _resume_from(history_id, messages, ids, failed, marks)
+                except Exception as e:
+                    if getattr(getattr(e, "resp", None), "status", None) != 404:
+                        raise
+                    log.info("Gmail historyId %s expired; falling back to full query.", start_history_id)
+            # Read the current historyId *before* listing so nothing added in between is missed.
+            history_id = service.users().getProfile(userId="me").execute().get("historyId")
+            ids = _list_ids(service, q, limit)
+            messages, failed = _get_messages_batched(service, ids)
+            return messages, _resume_from(history_id, messages, ids, failed)
+        except Exception as e:
+            log.error("Gmail incremental fetch failed: %s", e)
+            _on_gmail_error(e)
+            return [], None
+
 # ----------------- Gemini Helpers -----------------
-_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+# Dedicated, bounded pool for Gemini calls: caps QPS per process (shared by concurrent /run
+# calls) and keeps the default executor free for Gmail/DB offloading.
+_GEMINI_EXECUTOR = ThreadPoolExecutor(max_workers=GEMINI_CONCURRENCY, thread_name_prefix="gemini")
+
+
+# AIMD pacing for Gemini calls (see _RateLimiter).
+_AIMD_START_RPM = 60.0  # pace to halve from when the first throttle hits an unpaced worker
+_AIMD_UNPACED_RPM = 600.0  # GEMINI_RPM=0: recovered past this, stop pacing
+_AIMD_MIN_RPM = 6.0  # floor: one call per 10s
+_AIMD_WINDOW = 10.0  # seconds; throttles within this of the last cut are one event
+_AIMD_RECOVERY_RPM_PER_S = 10.0  # rate regained per second without a throttle
+
+
+class _RateLimiter:
+    """
+    Thread-safe AIMD call pacer: calls are evenly spaced at the current rate (no bursts).
+    A throttle halves the rate (at most once per _AIMD_WINDOW, so a burst of concurrent
+    429s counts once; never below _AIMD_MIN_RPM); the rate then climbs back linearly with
+    time, reaching `per_minute` (or, for per_minute=0, unpaced) within about a minute.
+    per_minute=0 starts unpaced and only paces (from _AIMD_START_RPM) after a throttle.
+    """
+
+    def __init__(self, per_minute: int):
+        self._cap = float(per_minute) if per_minute > 0 else 0.0
+        self._floor = min(_AIMD_MIN_RPM, self._cap) if self._cap else _AIMD_MIN_RPM
+        self._cut_rate = self._cap  # rate set by the last decrease
+        self._cut_at: Optional[float] = None  # monotonic time of the last decrease
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def _rate(self, now: float) -> float:
+        """Current calls/minute (0 = unpaced); caller holds the lock."""
+        if self._cut_at is None:
+            return self._cap
+        rate = self._cut_rate + _AIMD_RECOVERY_RPM_PER_S * (now - self._cut_at)
+        if rate >= (self._cap or _AIMD_UNPACED_RPM):
+            self._cut_at = None  # fully recovered
+            return self._cap
+        return rate
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            rate = self._rate(now)
+            if not rate:
+                return
+            slot = max(now, self._next)
+            self._next = slot + 60.0 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._cut_at is not None and now - self._cut_at < _AIMD_WINDOW:
+                return
+            rate = self._rate(now) or _AIMD_START_RPM
+            self._cut_rate = max(self._floor, rate * 0.5)
+            self._cut_at = now
+
+
+_GEMINI_LIMITER = _RateLimiter(GEMINI_RPM)
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _json_dumps(obj: Any) -> str:
+    """Compact UTF-8 JSON text (no \\u escaping of non-ASCII snippets)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Few-shot pairs (subject, snippet) -> (subject, notes) for the static prefix. Fixed text
+# keeps the prefix byte-identical across calls/workers, and together with the rules it
+# clears the context-cache minimum token count (a bare rule line was always rejected).
+_GEMINI_EXAMPLES: Tuple[Tuple[str, str, str, str], ...] = (
+    (
+        "Fwd: Invitation: Quarterly planning review @ Thu Oct 9, 2025 2pm - 3:30pm (PDT)",
+        "---------- Forwarded message --------- You have been invited to the following event. "
+        "Quarterly planning review. When: Thursday Oct 9, 2025 2pm – 3:30pm Pacific Time. "
+        "Where: Building 4, Room Redwood. Joining info: meet.google.com/abc-defg-hij",
+        "Quarterly planning review",
+        "Thu Oct 9, 2025, 2:00-3:30pm PT. Building 4, Room Redwood. "
+        "Video: meet.google.com/abc-defg-hij.",
+    ),
+    (
+        "RE: RE: dinner friday?",
+        "Works for me! Let's do 7:30 at Lupa on Thompson St, I'll book a table for four. "
+        "On Tue, Sam wrote: are we still on for friday dinner",
+        "Dinner at Lupa",
+        "Friday 7:30pm, Lupa (Thompson St). Table for four, booking in progress.",
+    ),
+    (
+        "[Meetup] PyData Berlin #92: Streaming pipelines in practice",
+        "Join us on Wednesday 12 November from 18:30 for two talks on streaming data "
+        "pipelines, followed by drinks. Venue: Betahaus, Rudi-Dutschke-Str. 23. RSVP required, "
+        "limited to 120 attendees.",
+        "PyData Berlin #92: Streaming pipelines in practice",
+        "Wed 12 Nov, from 18:30. Betahaus, Rudi-Dutschke-Str. 23. Two talks then drinks; "
+        "RSVP required (120 seats).",
+    ),
+    (
+        "Your appointment is confirmed",
+        "Hi Alex, your dental cleaning with Dr. Patel is confirmed for Monday, March 3 at "
+        "9:15 AM. Please arrive 10 minutes early. Reply C to cancel or R to reschedule.",
+        "Dental cleaning with Dr. Patel",
+        "Mon Mar 3, 9:15am (arrive 10 min early). Reply C to cancel, R to reschedule.",
+    ),
+    (
+        "Updated invitation: Design sync (moved)",
+        "This event has been changed. Design sync. New time: Tuesday 4 Feb 2025 11:00 – 11:30 "
+        "(GMT). Previously Monday 3 Feb. Organizer: priya@example.com",
+        "Design sync (rescheduled)",
+        "Moved to Tue 4 Feb 2025, 11:00-11:30 GMT (was Mon 3 Feb). Organizer: priya@example.com.",
+    ),
+    (
+        "Canceled event: 1:1 Jordan / Kim",
+        "This event has been canceled and removed from your calendar. 1:1 Jordan / Kim, "
+        "Friday Jun 6, 2025 4pm - 4:30pm (EDT).",
+        "Canceled: 1:1 Jordan / Kim",
+        "Canceled. Was Fri Jun 6, 2025, 4:00-4:30pm ET.",
+    ),
+    (
+        "Weekly newsletter — 5 things happening around town",
+        "Farmers market returns Saturdays 8am–1pm at Civic Plaza; free outdoor cinema "
+        "Friday at dusk in Riverside Park; library book sale all week.",
+        "Weekly newsletter: 5 things happening around town",
+        "Farmers market Saturdays 8am-1pm, Civic Plaza. Outdoor cinema Friday at dusk, "
+        "Riverside Park. Library book sale all week.",
+    ),
+    (
+        "Flight reminder: UA 1234 SFO → ORD tomorrow",
+        "Check in now for your flight departing San Francisco (SFO) at 6:05 AM on Sept 18, "
+        "arriving Chicago O'Hare (ORD) 12:17 PM. Confirmation: K7XQ2P. Terminal 3, Gate F14.",
+        "Flight UA 1234 SFO to ORD",
+        "Sept 18, dep 6:05am SFO (T3, gate F14), arr 12:17pm ORD. Confirmation K7XQ2P.",
+    ),
+    (
+        "Re: invoice #4471",
+        "Thanks, payment was sent this morning via bank transfer. Let me know if anything "
+        "else is needed.",
+        "Invoice #4471",
+        "Not an event. Payment for invoice #4471 sent by bank transfer.",
+    ),
+    (
+        "Team offsite – save the date!",
+        "Mark your calendars: team offsite 22–24 May at Lake Tahoe. Details and travel info "
+        "to follow. Please hold the dates.",
+        "Team offsite (save the date)",
+        "22-24 May, Lake Tahoe. Hold the dates; travel details to follow.",
+    ),
+)
+
+
+def _gemini_instruction() -> str:
+    """Rules + few-shot examples, serialized deterministically (see _GEMINI_EXAMPLES)."""
+    examples_in = [
+        {"id": str(i), "subject": subject, "snippet": snippet}
+        for i, (subject, snippet, _, _) in enumerate(_GEMINI_EXAMPLES)
+    ]
+    examples_out = [
+        {"id": str(i), "subject": subject, "notes": notes}
+        for i, (_, _, subject, notes) in enumerate(_GEMINI_EXAMPLES)
+    ]
+    return (
+        "You extract calendar events from emails.\n"
+        "You receive a JSON array of emails, each {id, subject, snippet}. "
+        "Return ONLY a strict JSON array with one {id, subject, notes} object per email, "
+        "echoing each id. No extra text.\n\n"
+        "Rules:\n"
+        "- subject: the event's name. Drop reply/forward prefixes (Re:, Fwd:, RE: RE:), "
+        "list tags ([Meetup]) and calendar boilerplate (Invitation:, Updated invitation:, "
+        "date/time suffixes). Mark changes as (rescheduled) or a Canceled: prefix. "
+        "If there is no clear event, keep the original subject without prefixes.\n"
+        "- notes: one or two short sentences with the date, time (with timezone when given), "
+        "place, and any action needed (RSVP, arrive early, confirmation codes, links). "
+        "Use only facts from the subject and snippet; never invent dates or places. "
+        "Keep the email's language. If the email is not about an event, start notes with "
+        "'Not an event.' and summarize it in one sentence.\n"
+        "- Never merge, split, reorder or skip emails: exactly one output object per input id.\n\n"
+        f"Example input:\n{_json_dumps(examples_in)}\n\n"
+        f"Example output:\n{_json_dumps(examples_out)}"
+    )
+
+
+# Static instruction: uploaded once as Gemini context cache (or system_instruction),
+# so per-message prompts carry only {subject, snippet}.
+GEMINI_INSTRUCTION = _gemini_instruction()
+GEMINI_CACHE_TTL = timedelta(hours=1)
+
+
+class _ParsedEvent(TypedDict):
+    """response_schema item for parse_events: the model is constrained to a list of these."""
+
+    id: str
+    subject: str
+    notes: str
+
+
+_GEMINI_GENERATION_CONFIG: Dict[str, Any] = {
+    "response_mime_type": "application/json",
+    "response_schema": list[_ParsedEvent],
+}
+if GEMINI_MAX_OUTPUT_TOKENS > 0:
+    # Bounds latency/cost of a runaway generation; a truncated batch is logged and passed through.
+    _GEMINI_GENERATION_CONFIG["max_output_tokens"] = GEMINI_MAX_OUTPUT_TOKENS * GEMINI_BATCH_SIZE
+
+# (CachedContent or None, retry/refresh-after). None + future deadline = caching unsupported.
+_gemini_cache: Tuple[Any, Optional[datetime]] = (None, None)
+
+
+def _gemini_cached_content():
+    """
+    Return a live CachedContent with GEMINI_INSTRUCTION, creating it when missing/expired.
+    Returns None if the model/account can't cache (e.g. prompt under the minimum token count);
+    creation is then not retried until the TTL window passes.
+    """
+    global _gemini_cache
+    cache, until = _gemini_cache
+    now = datetime.now(timezone.utc)
+    if until is not None and now < until:
+        return cache
+    try:
+        model_name = GEMINI_MODEL if GEMINI_MODEL.startswith("models/") else f"models/{GEMINI_MODEL}"
+        cache = genai.caching.CachedContent.create(
+            model=model_name,
+            system_instruction=GEMINI_INSTRUCTION,
+            ttl=GEMINI_CACHE_TTL,
+        )
+    except Exception as e:
+        log.info("Gemini context cache unavailable; using system_instruction: %s", e)
+        cache = None
+    # refresh a minute early so in-flight calls never reference an expired cache
+    _gemini_cache = (cache, now + GEMINI_CACHE_TTL - timedelta(minutes=1))
+    return cache
+
+
+_RETRY_DELAY_RE = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)|retry in ([\d.]+)s", re.I)
+
+
+def _is_throttled(e: Exception) -> bool:
+    """429 / 503 from Gemini (gRPC ResourceExhausted/ServiceUnavailable or REST status)."""
+    if getattr(e, "code", None) in (429, 503):
+        return True
+    msg = str(e).lower()
+    return "429" in msg or "resource exhausted" in msg or "resource_exhausted" in msg
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """Server-suggested wait in seconds: Retry-After header, else RetryInfo in the message."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    m = _RETRY_DELAY_RE.search(str(e))
+    return float(m.group(1) or m.group(2)) if m else None
+
+
+def _is_cache_expired(e: Exception) -> bool:
+    """Heuristic for 'cached content expired / not found' API errors."""
+    msg = str(e).lower()
+    return "cached" in msg and ("expire" in msg or "not found" in msg)
+
 
 def init_gemini():
     """Initialize Gemini client if configured; otherwise return None (pass-through)."""
     if genai is None or not GEMINI_API_KEY:
-        log.info("Gemini disabled or not configured. Using pass-through.")
+        log.debug("Gemini disabled or not configured. Using pass-through.")
         return None
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
+        # gRPC: one channel per process multiplexes the concurrent parse_events calls over a
+        # single kept-alive HTTP/2 connection (no per-call TLS, no requests pool to size).
+        genai.configure(api_key=GEMINI_API_KEY, transport="grpc")
+        cache = _gemini_cached_content()
+        if cache is not None:
+            return genai.GenerativeModel.from_cached_content(
+                cache, generation_config=_GEMINI_GENERATION_CONFIG
+            )
         return genai.GenerativeModel(
             GEMINI_MODEL,
-            generation_config={"response_mime_type": "application/json"},
+            system_instruction=GEMINI_INSTRUCTION,
+            generation_config=_GEMINI_GENERATION_CONFIG,
         )
     except Exception as e:
         log.error("Gemini init failed: %s", e)
         return None
 
 
-def _coerce_json(text: str) -> Dict:
+_gemini_model: Any = None
+_GEMINI_INIT_LOCK = threading.Lock()
+
+
+def _gemini_model_stale() -> bool:
+    """No model yet, or its context cache is past the early-refresh deadline."""
+    until = _gemini_cache[1]
+    return _gemini_model is None or until is None or datetime.now(timezone.utc) >= until
+
+
+def get_gemini_model():
+    """
+    Process-wide Gemini model (configure + context cache once per worker), rebuilt on a
+    fresh cache a minute before the old one expires. Double-checked lock so concurrent
+    callers init once; a failed init is not memoized, so the next call retries it.
+    """
+    global _gemini_model
+    if _gemini_model_stale():
+        with _GEMINI_INIT_LOCK:
+            if _gemini_model_stale():
+                _gemini_model = init_gemini()
+    return _gemini_model
+
+
+def _reset_gemini_model(stale: Any) -> None:
+    """
+    Drop the model (and its context cache) so get_gemini_model() rebuilds it — only if
+    `stale` is still the current one; concurrent failures then trigger a single rebuild.
+    """
+    global _gemini_model, _gemini_cache
+    with _GEMINI_INIT_LOCK:
+        if _gemini_model is stale:
+            _gemini_model = None
+            _gemini_cache = (None, None)
+
+
+def _generate(model, prompt: str):
+    """
+    model.generate_content under the AIMD limiter:
+    - 429/503: halve the pace, wait the server's retry delay, retry (GEMINI_MAX_RETRIES).
+    - expired context cache: recreate it once and retry.
+    """
+    model = get_gemini_model() or model  # pick up a scheduled cache refresh mid-run
+    retries, cache_retried = 0, False
+    while True:
+        _GEMINI_LIMITER.acquire()
+        try:
+            resp = model.generate_content(prompt)
+        except Exception as e:
+            if _is_throttled(e) and retries < GEMINI_MAX_RETRIES:
+                retries += 1
+                _GEMINI_LIMITER.on_throttle()
+                delay = min(_retry_after(e) or 2.0**retries, 60.0)
+                log.info(
+                    "Gemini throttled; retrying in %.1fs (%d/%d)", delay, retries, GEMINI_MAX_RETRIES
+                )
+                time.sleep(delay)
+                continue
+            if not _is_cache_expired(e) or cache_retried:
+                raise
+            log.info("Gemini context cache expired; recreating.")
+            cache_retried = True
+            _reset_gemini_model(model)
+            model = get_gemini_model()
+            if model is None:
+                raise
+            continue
+        return resp
+
+
+def _hit_token_cap(resp: Any) -> bool:
+    """True when generation stopped at max_output_tokens (finish_reason MAX_TOKENS)."""
+    for cand in getattr(resp, "candidates", None) or []:
+        reason = getattr(cand, "finish_reason", None)
+        if getattr(reason, "name", reason) in ("MAX_TOKENS", 2):
+            return True
+    return False
+
+
+def _json_start(text: str, pos: int = 0) -> int:
+    """Index of the first '{' or '[' at/after pos, or -1."""
+    hits = [i for i in (text.find("{", pos), text.find("[", pos)) if i != -1]
+    return min(hits) if hits else -1
+
+
+def _coerce_json(text: str) -> Any:
     """
-    Coerce model output to JSON, handling common code-fence cases.
+    Coerce model output to a JSON object/array, tolerating code fences / surrounding prose.
+    Fast path first: response_mime_type=application/json means clean JSON is the norm.
     Returns {} on failure.
     """
     text = (text or "").strip()
     if not text:
         return {}
-    m = _JSON_BLOCK_RE.search(text)
-    if m:
-        text = m.group(1).strip()
-    if text.startswith("```"):
-        text = text.strip("`")
-        if text.lower().startswith("json"):
-            text = text[4:].lstrip()
     try:
-        return json.loads(text)
-    except Exception:
-        a, b = text.find("{"), text.rfind("}")
-        if a != -1 and b > a:
-            try:
-                return json.loads(text[a : b + 1])
-            except Exception:
-                pass
+        obj = _json_loads(text)
+        return obj if isinstance(obj, (dict, list)) else {}
+    except ValueError:
+        pass
+    # One C-level pass from the first '{'/'[' (raw_decode ignores trailing fence/prose);
+    # if prose before the fence contains a stray bracket, retry from inside the fence.
+    for start in (_json_start(text), _json_start(text, text.find("```") + 3)):
+        if start == -1:
+            continue
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            continue
+        return obj if isinstance(obj, (dict, list)) else {}
     return {}
 
 
-def parse_event(model, subject: str, snippet: str) -> EventOut:
+def _coerce_items(text: str) -> List[Dict]:
+    """Model output as a list of objects (a bare or {"items": [...]}-wrapped object is tolerated)."""
+    data = _coerce_json(text)
+    if isinstance(data, dict):
+        data = data.get("items", [data] if data else [])
+    return [d for d in data if isinstance(d, dict)] if isinstance(data, list) else []
+
+
+def _normalize_for_cache(text: str) -> str:
+    """Casefold + collapse whitespace, so trivially re-flowed/re-cased copies share a key."""
+    return " ".join((text or "").casefold().split())
+
+
+# Prompt/model version mixed into every key: editing GEMINI_INSTRUCTION or switching
+# GEMINI_MODEL stops serving results produced under the old ones (they age out by TTL).
+_PARSE_CACHE_VERSION = hashlib.blake2b(
+    f"{GEMINI_MODEL}\x00{GEMINI_INSTRUCTION}".encode("utf-8"), digest_size=8
+).hexdigest()
+
+
+def _parse_cache_key(subject: str, snippet: str) -> str:
     """
-    If Gemini available, request compact JSON {subject, notes}; otherwise pass-through.
-    Always returns a valid EventOut (no exceptions propagate).
+    Stable key for a (subject, snippet) pair under the current prompt/model
+    (_PARSE_CACHE_VERSION), insensitive to case and whitespace.
     """
-    if model is None:
-        return EventOut(subject=subject, notes=snippet, source_snippet=snippet)
+    parts = (_PARSE_CACHE_VERSION, _normalize_for_cache(subject), _normalize_for_cache(snippet))
+    raw = "\x00".join(parts)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# In-process LRU in front of ai_parse_cache: repeats within a worker skip the DB round trip too.
+# Entries carry a monotonic deadline so a long-lived worker honors PARSE_CACHE_TTL_DAYS as well.
+PARSE_MEMO_SIZE = 1024
+_PARSE_MEMO_TTL = PARSE_CACHE_TTL_DAYS * 86400.0
+_parse_memo: "OrderedDict[str, Tuple[float, Tuple[Optional[str], Optional[str]]]]" = OrderedDict()
+_PARSE_MEMO_LOCK = threading.Lock()
+
+
+def _parse_memo_get(key: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    with _PARSE_MEMO_LOCK:
+        hit = _parse_memo.get(key)
+        if hit is None:
+            return None
+        if hit[0] <= time.monotonic():
+            del _parse_memo[key]
+            return None
+        _parse_memo.move_to_end(key)
+        return hit[1]
+
+
+def _parse_memo_put(key: str, value: Tuple[Optional[str], Optional[str]]) -> None:
+    with _PARSE_MEMO_LOCK:
+        _parse_memo[key] = (time.monotonic() + _PARSE_MEMO_TTL, value)
+        _parse_memo.move_to_end(key)
+        if len(_parse_memo) > PARSE_MEMO_SIZE:
+            _parse_memo.popitem(last=False)
+
+
+def _parse_cache_get(keys: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Cached (subject, notes) by key for the hits among `keys`; misses / DB down are absent."""
+    found: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    misses: List[str] = []
+    for key in keys:
+        hit = _parse_memo_get(key)
+        if hit is not None:
+            found[key] = hit
+        else:
+            misses.append(key)
+    if not misses or POOL is None:
+        return found
+    with get_db() as conn:
+        if not conn:
+            return found
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SQL_PARSE_CACHE_GET, (misses, PARSE_CACHE_TTL_DAYS), prepare=True)
+                rows = cur.fetchall()
+        except Exception as e:
+            log.warning("Parse cache read failed: %s", e)
+            return found
+    for key, subject, notes in rows:
+        found[key] = (subject, notes)
+        _parse_memo_put(key, (subject, notes))
+    return found
 
-    prompt = {
-        "instruction": "Return ONLY strict JSON with keys 'subject' and 'notes'. No extra text.",
-        "subject": subject,
-        "snippet": snippet,
-    }
+
+def _parse_cache_put(entries: Dict[str, Tuple[str, Optional[str]]]) -> None:
+    """Store Gemini results by key in one upsert; first writer wins unless expired."""
+    if not entries:
+        return
+    for key, value in entries.items():
+        _parse_memo_put(key, value)
+    if POOL is None:
+        return
+    keys = list(entries)  # dict keys: no duplicate key within the one INSERT
+    params = (
+        keys,
+        [entries[k][0] for k in keys],
+        [entries[k][1] for k in keys],
+        PARSE_CACHE_TTL_DAYS,
+    )
+    with get_db() as conn:
+        if not conn:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SQL_PARSE_CACHE_PUT, params, prepare=True)
+        except Exception as e:
+            log.warning("Parse cache write failed: %s", e)
+
+
+def parse_events(model, messages: Sequence[Tuple[str, str, str]]) -> List[_Event]:
+    """
+    Parse (gmail_id, subject, snippet) messages with ONE Gemini call (JSON array in/out);
+    without a model, pass-through. Results are cached in `public.ai_parse_cache`, so
+    repeated messages skip the model call. Always returns one _Event per message, in
+    order (no exceptions propagate; unparsed items fall back to pass-through).
+    """
+    events = [
+        _Event(subject=subject, notes=snippet, source_gmail_id=mid, source_snippet=snippet)
+        for mid, subject, snippet in messages
+    ]
+    if model is None:
+        return events
+
+    keys = [_parse_cache_key(subject, snippet) for _, subject, snippet in messages]
+    cache = _parse_cache_get(keys)  # one round trip for the whole batch
+    pending: Dict[str, Tuple[int, str]] = {}  # prompt id -> (index, cache key)
+    for i, (_, subject, snippet) in enumerate(messages):
+        key = keys[i]
+        cached = cache.get(key)
+        if cached:
+            events[i].subject = cached[0] or subject
+            events[i].notes = cached[1] or snippet
+        else:
+            pending[str(i)] = (i, key)
+    if not pending:
+        return events
+
+    # instruction lives in the cached prefix; the prompt is just the items (short ids
+    # keep tokens down and are mapped back by position)
+    prompt = _json_dumps(
+        [
+            {"id": pid, "subject": messages[i][1], "snippet": messages[i][2]}
+            for pid, (i, _) in pending.items()
+        ]
+    )
     try:
-        resp = model.generate_content(json.dumps(prompt))
-        data = _coerce_json(getattr(resp, "text", "") or "")
-        subj = (data.get("subject") or subject) if isinstance(data, dict) else subject
-        notes = (data.get("notes") or snippet) if isinstance(data, dict) else snippet
-        return EventOut(subject=subj, notes=notes, source_snippet=snippet)
+        resp = _generate(model, prompt)
     except Exception as e:
         log.warning("Gemini parse failed; fallback to pass-through: %s", e)
-        return EventOut(subject=subject, notes=snippet, source_snippet=snippet)
+        return events
+    if _hit_token_cap(resp):
+        log.warning(
+            "Gemini output truncated at max_output_tokens=%s (%d items); "
+            "raise or unset GEMINI_MAX_OUTPUT_TOKENS.",
+            _GEMINI_GENERATION_CONFIG.get("max_output_tokens"),
+            len(pending),
+        )
+    try:
+        items = _coerce_items(getattr(resp, "text", "") or "")
+    except Exception as e:  # e.g. no parts at all after a truncated/blocked generation
+        log.warning("Gemini returned no usable text; fallback to pass-through: %s", e)
+        return events
+    results: Dict[str, Tuple[str, Optional[str]]] = {}
+    for item in items:
+        hit = pending.pop(str(item.get("id")), None)
+        if hit is None:
+            continue
+        i, key = hit
+        evt = events[i]
+        evt.subject = item.get("subject") or evt.subject
+        evt.notes = item.get("notes") or evt.notes
+        results[key] = (evt.subject, evt.notes)  # only cache real model output
+    _parse_cache_put(results)
+    if pending:
+        log.warning("Gemini skipped %d of %d items; passed through.", len(pending), len(messages))
+    return events
 
 # ----------------- Routes -----------------
 @app.get("/health", tags=["System"])
-def health() -> Dict[str, str]:
+async def health() -> Dict[str, str]:
     """Simple readiness check for load balancers and smoke tests."""
     return {"status": "ok"}
 
 
+# Probes hit /health/db every few seconds; answer from a short-lived memo, not Neon.
+HEALTH_DB_TTL = 5.0
+HEALTH_DB_TIMEOUT = 2.0  # checkout / HTTP wait: a cold or down Neon answers 503 fast
+HEALTH_DB_WAIT = 5.0  # max wait on another probe's in-flight check (the query itself is unbounded)
+_health_db_cache: Dict[bool, Tuple[float, Dict[str, Any]]] = {}  # keyed by `exact`
+_health_db_inflight: Dict[bool, "Future[Dict[str, Any]]"] = {}
+_HEALTH_DB_LOCK = threading.Lock()
+
+
+def _check_db(exact: bool) -> Dict[str, Any]:
+    """
+    One round trip that proves connectivity and sizes public.events: the planner's
+    reltuples estimate by default (no scan), or COUNT(*) when `exact`.
+    """
+    sql = SQL_EVENTS_COUNT if exact else SQL_EVENTS_ESTIMATE
+    try:
+        if NEON_HTTP is not None:
+            rows = NEON_HTTP.execute(sql, timeout=HEALTH_DB_TIMEOUT)
+        else:
+            with get_db(timeout=HEALTH_DB_TIMEOUT) as conn:
+                if not conn:
+                    return {"status": "degraded", "db": "unavailable"}
+                with conn.cursor() as cur:
+                    cur.execute(sql)
+                    rows = cur.fetchall()
+        count = int(rows[0][0]) if rows and rows[0][0] is not None else None
+        return {"status": "ok", "db": "ok", "events": count, "exact": exact}
+    except Exception as e:
+        log.warning("DB health check failed: %s", e)
+        return {"status": "degraded", "db": "error"}
+
+
+@app.get("/health/db", tags=["System"])
+def health_db(
+    response: Response,
+    exact: bool = Query(False, description="Exact COUNT(*) instead of the planner estimate"),
+) -> Dict[str, Any]:
+    """
+    DB readiness + events row count (503 when unreachable); cached for HEALTH_DB_TTL s.
+    Probes arriving while a check runs wait for that check's result; the lock is never
+    held across the DB call.
+    """
+    with _HEALTH_DB_LOCK:
+        checked_at, result = _health_db_cache.get(exact, (0.0, {}))
+        stale = not result or time.monotonic() - checked_at >= HEALTH_DB_TTL
+        pending = _health_db_inflight.get(exact) if stale else None
+        owner = stale and pending is None
+        if owner:
+            pending = _health_db_inflight[exact] = Future()
+    if owner:
+        try:
+            result = _check_db(exact)
+        except Exception as e:  # _check_db degrades on its own; never strand the waiters
+            result = {"status": "degraded", "db": "error"}
+            log.warning("DB health check failed: %s", e)
+        with _HEALTH_DB_LOCK:
+            _health_db_cache[exact] = (time.monotonic(), result)  # stamped when it lands
+            del _health_db_inflight[exact]
+        pending.set_result(result)
+    elif pending is not None:
+        try:
+            result = pending.result(timeout=HEALTH_DB_WAIT)
+        except FutureTimeout:
+            result = {"status": "degraded", "db": "timeout"}
+    if result["status"] != "ok":
+        response.status_code = 503
+    return result
+
+
+_HISTORY_STATE_KEY = "gmail_history_id"
+
+
+def _known_source_ids(ids: List[str]) -> set:
+    """Subset of `ids` already stored (one indexed lookup via ux_events_source_message_id)."""
+    if not ids or POOL is None:
+        return set()
+    with get_db() as conn:
+        if not conn:
+            return set()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SQL_KNOWN_SOURCE_IDS, (ids,), prepare=True)
+                return {r[0] for r in cur.fetchall()}
+        except Exception as e:
+            log.warning("Known-id lookup failed; parsing all messages: %s", e)
+            return set()
+
+
+def _store_parsed(parsed: List[_Event]) -> Tuple[int, Optional[str]]:
+    """Insert parsed events; returns (inserted_rows, skipped_reason)."""
+    inserted, skipped = 0, None
+    if NEON_HTTP is not None:
+        try:
+            inserted = insert_via_http(NEON_HTTP, parsed)
+        except Exception as e:
+            skipped = str(e)
+            log.error("DB insert (HTTP) failed: %s", e)
+        return inserted, skipped
+    with get_db() as conn:
+        try:
+            if conn:
+                inserted = insert_into_public_events(conn, parsed)
+        except Exception as e:
+            skipped = str(e)
+            log.error("DB insert failed: %s", e)
+    return inserted, skipped
+
+
+# In-flight import for this worker: concurrent /run calls share it instead of re-running.
+_run_task: Optional["asyncio.Task[Dict[str, Any]]"] = None
+
+
 @app.post("/run", response_model=RunResponse, tags=["Importer"])
-def run(_: None = Depends(require_token)):
+async def run(_: None = Depends(require_token)):
+    """
+    Import Gmail → DB (see _run_import). Single-flight per worker: a call that arrives
+    while an import is running awaits that import's result rather than starting another
+    pass over Gmail/Gemini/Neon.
+    """
+    global _run_task
+    if _run_task is None or _run_task.done():
+        _run_task = asyncio.create_task(_run_import())
+    # shield: one caller disconnecting must not cancel the import the others await
+    content = await asyncio.shield(_run_task)
+    # Returned as a Response: RunResponse documents the shape, but FastAPI skips
+    # re-validating (and re-encoding) `details` through pydantic.
+    return _json_response(content)
+
+
+async def _run_import() -> Dict[str, Any]:
     """
     Pipeline:
-      1) Fetch Gmail messages matching `GMAIL_QUERY`
-      2) Optionally parse with Gemini (if configured)
+      1) Fetch Gmail messages matching `GMAIL_QUERY` (or, with GMAIL_HISTORY_SYNC=1, only
+         messages added since the stored historyId); drop ids already in `public.events`
+      2) Optionally parse with Gemini (if configured) — batched, bounded concurrent calls
       3) Insert into Neon `public.events` (idempotent by source_message_id)
+
+    The Google/psycopg clients are blocking, so each step runs via asyncio.to_thread;
+    the event loop stays free and independent network waits overlap.
     """
-    # 1) Gmail
-    gmail_service = build_gmail_service()
-    messages = fetch_gmail_messages(gmail_service, GMAIL_QUERY, limit=GMAIL_MAX_RESULTS)
+    # 1) Gmail (Gemini client init overlaps with Gmail client build)
+    gmail_service, gemini_model = await asyncio.gather(
+        asyncio.to_thread(get_gmail_service),
+        asyncio.to_thread(get_gemini_model),
+    )
+    history_id: Optional[str] = None
+    if GMAIL_HISTORY_SYNC:
+        start_history_id = await asyncio.to_thread(_sync_state_get, _HISTORY_STATE_KEY)
+        messages, history_id = await asyncio.to_thread(
+            fetch_gmail_changes, gmail_service, GMAIL_QUERY, GMAIL_MAX_RESULTS, start_history_id
+        )
+    else:
+        messages = await asyncio.to_thread(
+            fetch_gmail_messages, gmail_service, GMAIL_QUERY, GMAIL_MAX_RESULTS
+        )
     log.info("Fetched %d Gmail messages.", len(messages))
 
-    # 2) Gemini (optional)
-    gemini_model = init_gemini()
-    parsed: List[EventOut] = []
-    for mid, subject, snippet in messages:
-        evt = parse_event(gemini_model, subject, snippet)
-        evt.source_gmail_id = mid
-        parsed.append(evt)
+    # Skip messages already stored — no point paying Gemini for them again.
+    known = await asyncio.to_thread(_known_source_ids, [mid for mid, _, _ in messages])
+    new_messages = [m for m in messages if m[0] not in known]
+    if known:
+        log.info("Skipping %d already-imported messages.", len(known))
+
+    # 2) Gemini (optional) — GEMINI_BATCH_SIZE emails per call, at most GEMINI_CONCURRENCY
+    #    calls in flight; parse_events never raises, so one failure can't poison the run
+    loop = asyncio.get_running_loop()
+    batches = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                _GEMINI_EXECUTOR,
+                parse_events,
+                gemini_model,
+                new_messages[i : i + GEMINI_BATCH_SIZE],
+            )
+            for i in range(0, len(new_messages), GEMINI_BATCH_SIZE)
+        )
+    )
+    parsed: List[_Event] = [evt for batch in batches for evt in batch]
+
+    # 3) DB insert (idempotent) — large runs split across up to INSERT_PARALLEL pooled
+    #    connections; ON CONFLICT DO NOTHING makes the slices commutative. Nothing new
+    #    (e.g. every message already known) skips the pool checkout altogether.
+    n_slices = max(1, min(INSERT_PARALLEL, len(parsed) // INSERT_BATCH_SIZE))
+    step = -(-len(parsed) // n_slices) or 1  # range() step must be >= 1
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(_store_parsed, parsed[i : i + step])
+            for i in range(0, len(parsed), step)
+        )
+    )
+    inserted = sum(n for n, _ in results)
+    skipped = next((reason for _, reason in results if reason is not None), None)
+
+    if inserted:
+        _events_cache_clear()
+
+    # Advance the Gmail cursor only once this batch is safely stored.
+    if history_id and skipped is None:
+        await asyncio.to_thread(_sync_state_set, _HISTORY_STATE_KEY, str(history_id))
+
+    return {
+        "total_emails": len(messages),
+        "parsed_events": len(parsed),
+        "inserted_rows": inserted,
+        "skipped_reason": skipped,
+        "details": [asdict(e) for e in parsed],
+    }
+
 
-    # 3) DB insert (idempotent)
-    inserted, skipped = 0, None
-    conn = get_db()
+def _json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize raw DB rows directly, bypassing response_model validation."""
+    if orjson is not None:
+        return ORJSONResponse(content, headers=headers)
+    return JSONResponse(jsonable_encoder(content), headers=headers)
+
+
+NDJSON = "application/x-ndjson"
+
+
+def _ndjson_line(row: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(jsonable_encoder(row), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _stream_rows(sql: str, args: Tuple[Any, ...]) -> Iterator[bytes]:
+    """
+    NDJSON lines as Postgres produces rows (psycopg single-row mode); the pooled connection
+    is held only for the life of the stream. Starlette drives this on the threadpool.
+    """
+    with get_db() as conn:
+        if not conn:
+            log.warning("DB unavailable in /events stream; returning no rows.")
+            return
+        try:
+            with conn.cursor(row_factory=dict_row) as cur:
+                for row in cur.stream(sql, args):
+                    yield _ndjson_line(row)
+        except Exception as e:
+            # headers are already sent; the client sees a short stream
+            log.error("DB read failed in /events stream: %s", e)
+
+
+def _encode_cursor(ts: Optional[datetime], id: int) -> str:
+    """Opaque keyset cursor: base64url('<iso ts>|<id>')."""
+    raw = f"{ts.isoformat() if ts else ''}|{id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of _encode_cursor; 400 on anything malformed."""
     try:
-        if conn:
-            inserted = insert_into_public_events(conn, parsed)
-    except Exception as e:
-        skipped = str(e)
-        log.error("DB insert failed: %s", e)
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception:
-                pass
-
-    return RunResponse(
-        total_emails=len(messages),
-        parsed_events=len(parsed),
-        inserted_rows=inserted,
-        skipped_reason=skipped,
-        details=parsed,
-    )
+        ts, _, id_ = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").partition("|")
+        return datetime.fromisoformat(ts), int(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Per-worker TTL cache of /events pages (opt-in via EVENTS_CACHE_TTL). /run clears it only in
+# its own worker; other workers may serve a page up to EVENTS_CACHE_TTL seconds old, missing
+# rows that run just inserted.
+EVENTS_CACHE_SIZE = 256
+_EventsPage = Tuple[List[Dict[str, Any]], Optional[Dict[str, str]]]  # (rows, headers)
+_events_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, _EventsPage]]" = OrderedDict()
+_EVENTS_CACHE_LOCK = threading.Lock()
+
+
+def _events_cache_get(key: Tuple[Any, ...]) -> Optional[_EventsPage]:
+    if EVENTS_CACHE_TTL <= 0:
+        return None
+    with _EVENTS_CACHE_LOCK:
+        hit = _events_cache.get(key)
+        if hit is None:
+            return None
+        if hit[0] <= time.monotonic():
+            del _events_cache[key]
+            return None
+        _events_cache.move_to_end(key)
+        return hit[1]
+
+
+def _events_cache_put(key: Tuple[Any, ...], page: _EventsPage) -> None:
+    if EVENTS_CACHE_TTL <= 0:
+        return
+    with _EVENTS_CACHE_LOCK:
+        _events_cache[key] = (time.monotonic() + EVENTS_CACHE_TTL, page)
+        _events_cache.move_to_end(key)
+        if len(_events_cache) > EVENTS_CACHE_SIZE:
+            _events_cache.popitem(last=False)
+
+
+def _events_cache_clear() -> None:
+    with _EVENTS_CACHE_LOCK:
+        _events_cache.clear()
 
 
 @app.get("/events", response_model=List[EventRecord], tags=["Events"])
 def list_events(
+    request: Request,
     _: None = Depends(require_token),
     q: Optional[str] = Query(None, description="Search subject/location (ILIKE)"),
     date_from: Optional[datetime] = Query(None, description="Filter event_datetime >= this"),
     date_to: Optional[datetime] = Query(None, description="Filter event_datetime <= this"),
     recurring: Optional[bool] = Query(None, description="Filter by raw_payload.recurring boolean if present"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value from the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True, description="Prefer `cursor` (OFFSET rescans skipped rows)"),
+    compact: bool = Query(False, description="Omit raw_payload (smaller rows for table views)"),
 ):
     """
     List events with optional filters.
     - `q` searches subject and location (ILIKE).
     - `date_from` / `date_to` filter event_datetime window.
     - `recurring`: filters using raw_payload->>'recurring' when present.
-    - Pagination via `limit` + `offset`.
+    - Keyset pagination: pass the previous page's `X-Next-Cursor` header as `cursor`
+      (seeks on the ordering index; cost is flat regardless of depth).
+    - `compact=true` leaves out raw_payload (fetch one event for the full record).
+    - With EVENTS_CACHE_TTL > 0, pages are cached per worker for that long (cleared by /run
+      inserts in the same worker only; other workers can be stale after a run).
+    - `Accept: application/x-ndjson` streams one JSON row per line as it is read
+      (uncached; no X-Next-Cursor, since headers go out before the last row is known).
     """
-    conn = get_db()
-    if not conn:
-        log.warning("DB unavailable in /events; returning empty list.")
-        return []
-
-    clauses = []
+    active: List[str] = []
     args: List[Any] = []
 
     if q:
-        clauses.append("(subject ILIKE %s OR location ILIKE %s)")
+        active.append("q")
         args.extend([f"%{q}%", f"%{q}%"])
 
     if date_from:
-        clauses.append("(event_datetime IS NOT NULL AND event_datetime >= %s)")
+        active.append("date_from")
         args.append(date_from)
 
     if date_to:
-        clauses.append("(event_datetime IS NOT NULL AND event_datetime <= %s)")
+        active.append("date_to")
         args.append(date_to)
 
     if recurring is not None:
-        # JSONB boolean; records without the key won't match either value.
-        clauses.append("((raw_payload->>'recurring')::boolean = %s)")
-        args.append(recurring)
-
-    where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
-
-    sql = f"""
-    SELECT
-      id,
-      source_message_id,
-      subject,
-      sender,
-      event_datetime,
-      location,
-      raw_payload,
-      created_at
-    FROM public.events
-    {where_sql}
-    ORDER BY COALESCE(event_datetime, created_at) DESC NULLS LAST
-    LIMIT %s OFFSET %s;
-    """
+        active.append("recurring")
+        args.append("true" if recurring else "false")
+
+    if cursor:
+        active.append("cursor")
+        args.extend(_decode_cursor(cursor))
 
+    sql = _list_sql(tuple(active), compact)
     args.extend([limit, offset])
 
-    rows: List[EventRecord] = []
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, tuple(args))
-            for (
-                _id,
-                _source_message_id,
-                _subject,
-                _sender,
-                _event_datetime,
-                _location,
-                _raw_payload,
-                _created_at,
-            ) in cur.fetchall():
-                rows.append(
-                    EventRecord(
-                        id=_id,
-                        source_message_id=_source_message_id,
-                        subject=_subject,
-                        sender=_sender,
-                        event_datetime=_event_datetime,
-                        location=_location,
-                        raw_payload=_raw_payload,
-                        created_at=_created_at,
-                    )
-                )
-    except Exception as e:
-        log.error("DB read failed in /events: %s", e)
-        return []
-    finally:
+    if NDJSON in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_rows(sql, tuple(args)), media_type=NDJSON)
+
+    # Checked before a connection is taken: a hit costs no pool checkout or round trip.
+    key = (q, date_from, date_to, recurring, limit, cursor, offset, compact)
+    hit = _events_cache_get(key)
+    if hit is not None:
+        return _json_response(hit[0], headers=hit[1])
+
+    with get_db() as conn:
+        if not conn:
+            log.warning("DB unavailable in /events; returning empty list.")
+            return []
         try:
-            conn.close()
-        except Exception:
-            pass
+            # Plain dicts go straight to the JSON encoder: no per-row Pydantic validation
+            # (the route's response_model now only documents the schema).
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, tuple(args))
+                rows: List[Dict[str, Any]] = cur.fetchall()
+        except Exception as e:
+            log.error("DB read failed in /events: %s", e)
+            return []
 
-    return rows
+    headers = None
+    if len(rows) == limit:
+        last = rows[-1]
+        headers = {"X-Next-Cursor": _encode_cursor(last["event_datetime"] or last["created_at"], last["id"])}
+    _events_cache_put(key, (rows, headers))
+    return _json_response(rows, headers=headers)
+
+
+def _conditional_event(rec: EventRecord, request: Optional[Request], response: Optional[Response]):
+    """
+    Rows are immutable after insert, so (id, created_at) is a sufficient validator.
+    Returns 304 when the client's If-None-Match matches; otherwise tags the 200 response.
+    """
+    created = int(rec.created_at.timestamp()) if rec.created_at else 0
+    etag = f'W/"{rec.id}-{created}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    inm = request.headers.get("if-none-match") if request is not None else None
+    if inm and (inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))):
+        return Response(status_code=304, headers=headers)
+    if response is not None:
+        response.headers.update(headers)
+    return rec
 
 
 @app.get("/events/{id}", response_model=EventRecord, tags=["Events"])
-def get_event_by_id(id: int, _: None = Depends(require_token)):
-    """Fetch a single event by primary key id."""
-    conn = get_db()
+def get_event_by_id(
+    id: int,
+    _: None = Depends(require_token),
+    conn: Any = Depends(get_conn),  # FastAPI evals annotations; psycopg may be None
+    request: Request = None,
+    response: Response = None,
+):
+    """Fetch a single event by primary key id (ETag / 304 aware)."""
     if not conn:
         raise HTTPException(status_code=503, detail="DB unavailable")
-
-    sql = """
-    SELECT
-      id, source_message_id, subject, sender,
-      event_datetime, location, raw_payload, created_at
-    FROM public.events
-    WHERE id = %s;
-    """
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, (id,))
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Event not found")
-            return EventRecord(
-                id=row[0],
-                source_message_id=row[1],
-                subject=row[2],
-                sender=row[3],
-                event_datetime=row[4],
-                location=row[5],
-                raw_payload=row[6],
-                created_at=row[7],
-            )
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+    with conn.cursor(row_factory=class_row(EventRecord)) as cur:
+        cur.execute(SQL_GET_BY_ID, (id,), prepare=True)
+        row = cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _conditional_event(row, request, response)
 
 
 @app.get("/events/by-source/{source_message_id}", response_model=EventRecord, tags=["Events"])
-def get_event_by_source(source_message_id: str, _: None = Depends(require_token)):
-    """Fetch a single event by source_message_id (e.g., Gmail message id)."""
-    conn = get_db()
+def get_event_by_source(
+    source_message_id: str,
+    _: None = Depends(require_token),
+    conn: Any = Depends(get_conn),  # FastAPI evals annotations; psycopg may be None
+    request: Request = None,
+    response: Response = None,
+):
+    """Fetch a single event by source_message_id (e.g., Gmail message id; ETag / 304 aware)."""
     if not conn:
         raise HTTPException(status_code=503, detail="DB unavailable")
+    with conn.cursor(row_factory=class_row(EventRecord)) as cur:
+        cur.execute(SQL_GET_BY_SOURCE, (source_message_id,), prepare=True)
+        row = cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _conditional_event(row, request, response)
 
-    sql = """
-    SELECT
-      id, source_message_id, subject, sender,
-      event_datetime, location, raw_payload, created_at
-    FROM public.events
-    WHERE source_message_id = %s;
+# ----------------- Startup -----------------
+def _warm_up() -> None:
+    """
+    Blocking warm-up, run off the event loop after startup:
+    - Build the Gmail/Gemini clients once (cached for the process lifetime).
+    - Ping DB (wakes a suspended Neon compute) and, if RUN_DDL_ON_STARTUP, ensure
+      indexes/tables exist.
+    - Never raises (service remains usable for /health).
     """
     try:
-        with conn.cursor() as cur:
-            cur.execute(sql, (source_message_id,))
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Event not found")
-            return EventRecord(
-                id=row[0],
-                source_message_id=row[1],
-                subject=row[2],
-                sender=row[3],
-                event_datetime=row[4],
-                location=row[5],
-                raw_payload=row[6],
-                created_at=row[7],
-            )
-    finally:
+        get_gmail_service()
+        get_gemini_model()
+    except Exception as e:
+        log.warning("Client warm-up failed (built on first /run instead): %s", e)
+    if NEON_HTTP is not None:
         try:
-            conn.close()
-        except Exception:
-            pass
+            NEON_HTTP.execute("SELECT 1;")
+            log.info("✅ DB ping (HTTP) ok.")
+        except Exception as e:
+            log.warning("DB ping over HTTP failed (app still starts): %s", e)
+    if POOL is not None:
+        with get_db() as conn:
+            try:
+                if conn:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1;")
+                    log.info("✅ DB ping ok.")
+            except Exception as e:
+                log.warning("DB ping failed (app still starts): %s", e)
+                conn = None
+            if conn and RUN_DDL_ON_STARTUP:
+                # Required tables first, optional pg_trgm last; each step on its own (autocommit),
+                # so one failure (no CREATE EXTENSION grant, a race with another worker) can't
+                # leave the others undone.
+                for ensure in (
+                    ensure_parse_cache,
+                    ensure_sync_state,
+                    ensure_indexes,  # safe: IF NOT EXISTS
+                    ensure_trigram_indexes,
+                ):
+                    try:
+                        ensure(conn)
+                    except Exception as e:
+                        log.warning(
+                            "Startup DDL %s failed (app still starts): %s", ensure.__name__, e
+                        )
+    log.info("✅ Warm-up complete.")
+
+
+def _prime_pool(timeout: float) -> None:
+    """
+    Hold DB_POOL_MIN connections at once (each passes check_connection), then return them.
+    Unlike POOL.wait(), a timeout here leaves the pool open and still connecting.
+    """
+    conns = []
+    try:
+        for _ in range(DB_POOL_MIN):
+            conns.append(POOL.getconn(timeout=timeout))
+    finally:
+        for conn in conns:
+            POOL.putconn(conn)
 
-# ----------------- Startup -----------------
-@app.on_event("startup")
-def on_startup():
+
+async def on_startup():
     """
-    Light startup checks:
-    - Ping DB (if configured) and ensure unique index exists.
-    - Do not fail startup on DB errors (service remains usable for /health).
+    Light startup: open the connection pool and schedule _warm_up as a background task,
+    so /health answers immediately instead of waiting out a Neon cold start.
+    With DB_POOL_WARM, serving starts only once DB_POOL_MIN connections are connected
+    (TLS + auth done up front, so the first burst of requests doesn't stampede Neon).
     """
     log.info("🚀 Starting AI Events Agent")
     if psycopg is None:
         log.warning("psycopg not loaded — ensure psycopg is installed.")
-    if DATABASE_URL and psycopg is not None:
-        conn = get_db()
-        try:
-            if conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT 1;")
-                ensure_indexes(conn)  # safe: IF NOT EXISTS
-                log.info("✅ DB ping + indexes ok.")
-        except Exception as e:
-            log.warning("DB ping failed (app still starts): %s", e)
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
+    if POOL is not None:
+        POOL.open()  # min_size conns connect in the background
+        if DB_POOL_WARM:
+            try:
+                await asyncio.to_thread(_prime_pool, DB_POOL_WARM_TIMEOUT)
+                log.info("✅ DB pool warm (%d connections).", DB_POOL_MIN)
+            except Exception as e:
+                log.warning("DB pool warm-up incomplete (app still starts): %s", e)
+    # keep a reference so the task isn't garbage-collected mid-flight
+    app.state.warmup = asyncio.create_task(asyncio.to_thread(_warm_up))
     log.info("✅ App ready — Swagger /docs live (Authorize persists).")
+
+
+def tune_threadpools():
+    """
+    Raise the blocking-work ceilings (both default to a few dozen threads):
+    - AnyIO limiter: sync `def` routes (psycopg reads) run on this pool.
+    - asyncio default executor: asyncio.to_thread offloads in /run.
+    Threads here mostly sit in network waits (Neon, Gmail), so a larger pool is cheap.
+    Runs first in lifespan, so the warm-up offload already uses the larger executor.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREADPOOL_SIZE, thread_name_prefix="offload")
+    )
+
+
+def on_shutdown():
+    """Close pooled connections so Neon can scale the compute down cleanly."""
+    if POOL is not None:
+        POOL.close()